@@ -1,2 +1,3 @@
-from data.create_db import Base, Team, Player, TeamPlayer, Ranking, Game, Statistics, create_database
+from data.create_db import Base, Team, Player, TeamPlayer, Ranking, Calendar, Game, Statistics, Quarantine, create_database, create_search_index
+from data.validate_data import validate_data
 from data.process_data import check_inputs, is_path
\ No newline at end of file
@@ -1,7 +1,8 @@
 from sqlalchemy import create_engine
-from sqlalchemy import Column, ForeignKey, String, Float, Date, Integer
+from sqlalchemy import Column, ForeignKey, String, Float, Date, Integer, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, validates, backref
+from sqlalchemy.exc import OperationalError
 
 Base = declarative_base()
 
@@ -58,7 +59,17 @@ class Ranking(Base):
     return_to_play = Column(String(10))
     teams = relationship('Team', backref=backref('ranks', lazy='dynamic'))   
 
-#5. Games Table
+#5. Calendar Table
+class Calendar(Base):
+    '''An SQL Alchemy class used in creating the calendar table of weeks (Sunday to Saturday)'''
+    __tablename__ = 'calendar'
+    week_id = Column(Integer, primary_key=True, autoincrement=False)
+    week_start = Column(Date())
+    week_end = Column(Date())
+    season = Column(Integer)
+    season_week = Column(Integer)
+
+#6. Games Table
 class Game(Base):
     '''An SQL Alchemy class used in creating the games table'''
     __tablename__ = 'game'
@@ -68,17 +79,20 @@ class Game(Base):
     visitor_team_id = Column(Integer, ForeignKey('team.id'))
     game_status_text = Column(String(60))
     season = Column(Integer)
+    week_id = Column(Integer, ForeignKey('calendar.week_id'), index=True)
+    season_week = Column(Integer)
+    week = relationship('Calendar', backref=backref('games', lazy='dynamic'))
     home_team = relationship('Team', foreign_keys=[home_team_id], backref=backref('away_games', lazy='dynamic'))
     away_team = relationship('Team', foreign_keys=[visitor_team_id], backref=backref('home_games', lazy='dynamic'))
 
-#6. Statistics Table
+#7. Statistics Table
 class Statistics(Base):
     '''An SQL Alchemy class used in creating the games_details table'''
     __tablename__ = 'statistics'
     stat_id = Column(Integer, primary_key=True, autoincrement=True)
     team_id = Column(Integer, ForeignKey('team.id'))
-    game_id = Column(Integer, ForeignKey('game.id'))
-    player_id = Column(Integer, ForeignKey('player.id'))
+    game_id = Column(Integer, ForeignKey('game.id'), index=True)
+    player_id = Column(Integer, ForeignKey('player.id'), index=True)
     comment = Column(String(300), default='Empty Comment')
     minute = Column(String(10))
     field_g_made = Column(Float)
@@ -100,6 +114,16 @@ class Statistics(Base):
     game = relationship('Game', backref=backref('stats', lazy='dynamic'), cascade="all, delete")
     player = relationship('Player', backref=backref('stats', lazy='dynamic'))
 
+#8. Quarantine Table
+class Quarantine(Base):
+    '''An SQL Alchemy class used in creating the quarantine table of rows rejected before loading'''
+    __tablename__ = 'quarantine'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    table_name = Column(String(60))
+    reason = Column(String(60))
+    column_name = Column(String(60))
+    record = Column(Text)
+
 def create_database(database_filepath='my_db'):
     '''Main. Creates a predefined SQlite database using SQL alchemy.
     When run on the system, it takes an argument variable.
@@ -111,3 +135,19 @@ def create_database(database_filepath='my_db'):
     engine = create_engine('sqlite:///'+database_filepath)
     Base.metadata.create_all(engine)
     print(f'database {database_filepath} succesfully created')
+
+def create_search_index(engine):
+    '''Builds the player_search full text index over player names.
+    Uses the FTS5 trigram tokenizer so any part of a name matches, falling back
+    to word prefixes on SQLite builds older than 3.34 without it.
+    Rebuild it whenever the player table is reloaded.
+    '''
+    with engine.begin() as connection:
+        connection.exec_driver_sql('DROP TABLE IF EXISTS player_search')
+        try:
+            connection.exec_driver_sql("""CREATE VIRTUAL TABLE player_search USING fts5(player_name,
+                                          content='player', content_rowid='rowid', tokenize='trigram')""")
+        except OperationalError:
+            connection.exec_driver_sql("""CREATE VIRTUAL TABLE player_search USING fts5(player_name,
+                                          content='player', content_rowid='rowid', prefix='1 2 3')""")
+        connection.exec_driver_sql("INSERT INTO player_search(player_search) VALUES('rebuild')")
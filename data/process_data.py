@@ -7,11 +7,20 @@ try:
     import numpy as np
     from pathlib import Path
     from sqlalchemy import create_engine
-    from process_dataframes import process_teams_data, process_players_data
-    from process_dataframes import process_ranking_data, process_games_data, process_stat_data
-    from create_db import create_database
 except:
     print('Some files may have import clashes.')
+try:
+    from data.process_dataframes import process_teams_data, process_players_data
+    from data.process_dataframes import process_ranking_data, process_games_data, process_stat_data
+    from data.process_dataframes import process_calendar_data
+    from data.create_db import create_database, create_search_index
+    from data.validate_data import validate_data
+except ImportError:
+    from process_dataframes import process_teams_data, process_players_data
+    from process_dataframes import process_ranking_data, process_games_data, process_stat_data
+    from process_dataframes import process_calendar_data
+    from create_db import create_database, create_search_index
+    from validate_data import validate_data
 
 def is_path(filepath, checktype='dir'):
     """Checks if a path or directory exists.
@@ -82,27 +91,37 @@ def clean_data(df_dict):
     """
     #going down each key, we clean the dataframes in the dictionary
     df_dict['team'] = process_teams_data(df_dict['team'])
-    [df_dict['player'], df_dict['season_player']] = process_players_data(df_dict['player'])
+    [df_dict['player'], df_dict['team_player']] = process_players_data(df_dict['player'])
     df_dict['ranking'] = process_ranking_data(df_dict['ranking'])
     df_dict['game'] = process_games_data(df_dict['game'])
+    [df_dict['game'], df_dict['calendar']] = process_calendar_data(df_dict['game'])
     df_dict['statistics'] = process_stat_data(df_dict['statistics'])
     return df_dict
 
 
 def save_data(df_dict, database_filepath):
     """Save content of a dataframe to a database
+    Rows failing the schema checks of validate_data are written to the quarantine table instead.
+    Everything is written in one transaction, so a failed load leaves the database unchanged.
     Args:
     df_dict pandas.Dataframe: A dictionary of pandas dataframes for
             which each value is saved to the database
     database_filepath str: A filepath for the database name
-    Returns:
-    A cleaned pandas dataframe.
     """
+    print('Validating data.....')
+    df_dict, quarantine_df = validate_data(df_dict)
+    if len(quarantine_df):
+        print(f'{len(quarantine_df)} rows recorded in the quarantine table, repaired_null and unknown_reference rows are still loaded:')
+        print(quarantine_df.groupby(['table_name', 'reason', 'column_name']).size().to_string())
     create_database(database_filepath)
     engine = create_engine('sqlite:///'+database_filepath)
-    for key in df_dict.keys():
-        print(f'Writing to {key} table to {database_filepath}.....')
-        df_dict[key].to_sql(f'{key}', engine, index=False, chunksize=20, method='multi', if_exists='append')
+    with engine.begin() as connection:
+        for key in df_dict.keys():
+            print(f'Writing to {key} table to {database_filepath}.....')
+            df_dict[key].to_sql(f'{key}', connection, index=False, chunksize=20, method='multi', if_exists='append')
+        quarantine_df.to_sql('quarantine', connection, index=False, chunksize=20, method='multi', if_exists='append')
+    print('Building the player search index.....')
+    create_search_index(engine)
 
 def del_filefolder(filefolder):
     """Deletes a file folder
@@ -1,6 +1,9 @@
 import pandas as pd
 import numpy as np
 
+#weeks run from Sunday to Saturday and are counted from Sunday 1970-01-04
+WEEK_EPOCH = pd.Timestamp('1970-01-04')
+
 def process_teams_data(dataframe):
     """Cleans a teams.csv dataset and returns a dataframe
     Args:
@@ -41,7 +44,7 @@ def process_players_data(dataframe):
                                   'PLAYER_NAME':'player_name',
                                   'TEAM_ID': 'team_id',
                                   'SEASON': 'season'})
-    team_players_df = dataframe.drop(columns=['player_name'])
+    team_players_df = dataframe.drop(columns=['player_name']).rename(columns={'id': 'player_id'})
 
     players_df = dataframe.drop(columns=['season','team_id'])
     players_df.drop_duplicates(inplace=True)
@@ -88,6 +91,31 @@ def process_games_data(dataframe):
                     'SEASON': 'season'}))
     return dataframe
 
+def process_calendar_data(dataframe):
+    """Assigns every game an integer week and builds the calendar table of weeks
+    Args:
+    dataframe pandas.Dataframe: A games dataframe cleaned by process_games_data
+    Returns:
+    A list of two pandas dataframes.
+    list: [pandas.Dataframe for games with week_id and season_week, pandas.Dataframe for calendar]
+    The calendar holds every week from the first to the last week of each season.
+    """
+    dataframe['week_id'] = (dataframe.game_date_est - WEEK_EPOCH).dt.days // 7
+    first_weeks = dataframe.groupby('season')['week_id'].transform('min')
+    dataframe['season_week'] = dataframe['week_id'] - first_weeks + 1
+
+    bounds = dataframe.groupby('season')['week_id'].agg(['min', 'max']).dropna().astype(int)
+    lengths = (bounds['max'] - bounds['min'] + 1).values
+    calendar_df = pd.DataFrame({'season': np.repeat(bounds.index.values, lengths),
+                                'season_week': np.concatenate([np.arange(1, length + 1) for length in lengths])
+                                               if len(lengths) else []})
+    calendar_df['week_id'] = np.repeat(bounds['min'].values, lengths) + calendar_df['season_week'] - 1
+    calendar_df['week_start'] = WEEK_EPOCH + pd.to_timedelta(calendar_df['week_id'] * 7, unit='D')
+    calendar_df['week_end'] = calendar_df['week_start'] + pd.Timedelta(days=7)
+    calendar_df = calendar_df.drop_duplicates('week_id', keep='last')
+    calendar_df = calendar_df.reindex(columns=['week_id', 'week_start', 'week_end', 'season', 'season_week'])
+    return [dataframe, calendar_df]
+
 def process_stat_data(dataframe):
     """Cleans a game_details.csv dataset and returns a dataframe
     Args:
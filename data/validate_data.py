@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+try:
+    from data.create_db import Base
+except ImportError:
+    from create_db import Base
+
+QUARANTINE_COLUMNS = ['table_name', 'reason', 'column_name', 'record']
+#written into empty NOT NULL text columns that are not keys, e.g. a team without an arena
+NULL_PLACEHOLDER = 'Unknown'
+#foreign keys loaded even when the referenced row is missing, such players show up as 'Name Unknown'
+LOGGED_REFERENCES = ['statistics.player_id']
+#tables only loaded whole per parent row: team totals and labels of a game come from all of its statistics rows
+WHOLE_GROUPS = {'statistics': 'game_id'}
+#reasons of rows that are recorded in the quarantine table but still loaded
+LOADED_REASONS = ['repaired_null', 'unknown_reference']
+
+def quarantine_rows(table_name, reason, column_name, dataframe):
+    """Turns rejected rows into quarantine records.
+    Args:
+    table_name str: The table the rows were meant for
+    reason str: The reason code of the failed check
+    column_name str: The column that failed the check
+    dataframe pandas.Dataframe: The rejected rows
+    Returns:
+    A pandas dataframe with QUARANTINE_COLUMNS, each row kept as a JSON record.
+    """
+    records = dataframe.to_json(orient='records', lines=True, date_format='iso').splitlines()
+    return pd.DataFrame({'table_name': table_name, 'reason': reason,
+                         'column_name': column_name, 'record': records}, columns=QUARANTINE_COLUMNS)
+
+def table_checks(table, dataframe, valid, df_dict):
+    """Runs the checks the database schema would enforce on a table, one whole column at a time.
+    Args:
+    table: An SQL Alchemy Table of Base.metadata
+    dataframe pandas.Dataframe: The cleaned rows meant for the table
+    valid dict: The rows of the tables already validated, used as the keys foreign keys can point at
+    df_dict dict: The cleaned rows of every table, before validation
+    Returns:
+    A list of (reason, column_name, mask) tuples. mask is a boolean numpy array, True for failing rows.
+    Reason codes:
+    null: a key or foreign key column that must be set is empty
+    repaired_null: any other NOT NULL column is empty, it is filled with NULL_PLACEHOLDER if it holds text
+    duplicate_key: the primary key repeats an earlier row
+    missing_reference: a foreign key value is not a key of the referenced table
+    rejected_parent: the referenced row exists but was quarantined itself
+    unknown_reference: a missing reference in LOGGED_REFERENCES, the row is still loaded
+    """
+    checks = []
+    for column in table.columns:
+        if column.name in dataframe.columns and (column.primary_key or not column.nullable):
+            repairable = not (column.primary_key or column.foreign_keys) and column.type.python_type is str
+            checks.append(('repaired_null' if repairable else 'null', column.name, dataframe[column.name].isna().values))
+
+    keys = [column.name for column in table.primary_key.columns if column.name in dataframe.columns]
+    if keys:
+        checks.append(('duplicate_key', ','.join(keys), dataframe.duplicated(subset=keys).values))
+
+    #table.foreign_keys is a set, sort it so a row failing several keys always gets the same reason
+    for foreign_key in sorted(table.foreign_keys, key=lambda key: key.parent.name):
+        column, parent = foreign_key.parent.name, foreign_key.column
+        if column in dataframe.columns and parent.table.name in valid:
+            values = dataframe[column]
+            missing = values.notna() & ~values.isin(df_dict[parent.table.name][parent.name])
+            if f'{table.name}.{column}' in LOGGED_REFERENCES:
+                checks.append(('unknown_reference', column, missing.values))
+                continue
+            checks.append(('missing_reference', column, missing.values))
+            rejected = values.notna() & ~missing & ~values.isin(valid[parent.table.name][parent.name])
+            checks.append(('rejected_parent', column, rejected.values))
+    return checks
+
+def validate_data(df_dict):
+    """Checks the cleaned dataframes against the database schema before anything is written.
+    Tables are checked parents first, so rows pointing at a quarantined row are quarantined too.
+    Only rejected rows cascade: repaired and logged rows (LOADED_REASONS) are loaded with their children.
+    A row failing several checks is quarantined once, under the first failed check.
+    When rows of a WHOLE_GROUPS table fail for any other reason than their parent, the parent row and all
+    of its rows are quarantined as partial_game, so a game is either loaded whole or not at all.
+    Args:
+    df_dict dict: Keys are the database table names, objects are cleaned pandas dataframes
+    Returns:
+    A list of two items.
+    list: [dict of the dataframes without the failing rows, pandas.Dataframe of quarantined rows]
+    """
+    valid, quarantined = dict(df_dict), []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in df_dict:
+            continue
+        dataframe = df_dict[table.name]
+        failed, logged = np.zeros(len(dataframe), dtype=bool), np.zeros(len(dataframe), dtype=bool)
+        parent_failed = np.zeros(len(dataframe), dtype=bool)
+        group_column = WHOLE_GROUPS.get(table.name)
+        for reason, column_name, mask in table_checks(table, dataframe, valid, df_dict):
+            if reason in LOADED_REASONS:
+                if (mask & ~failed & ~logged).any():
+                    quarantined.append(quarantine_rows(table.name, reason, column_name, dataframe[mask & ~failed & ~logged]))
+                if reason == 'repaired_null' and mask.any():
+                    dataframe = dataframe.copy()
+                    dataframe.loc[mask, column_name] = NULL_PLACEHOLDER
+                logged |= mask
+                continue
+            if (mask & ~failed).any():
+                quarantined.append(quarantine_rows(table.name, reason, column_name, dataframe[mask & ~failed]))
+            if column_name == group_column:
+                parent_failed |= mask & ~failed
+            failed |= mask
+
+        if group_column is not None and (failed & ~parent_failed).any():
+            [parent] = [key.column for key in table.foreign_keys if key.parent.name == group_column]
+            groups = dataframe.loc[failed & ~parent_failed, group_column]
+            partial = dataframe[group_column].isin(groups).values & ~failed
+            if partial.any():
+                quarantined.append(quarantine_rows(table.name, 'partial_game', group_column, dataframe[partial]))
+            parents = valid[parent.table.name]
+            partial_parents = parents[parent.name].isin(groups)
+            if partial_parents.any():
+                quarantined.append(quarantine_rows(parent.table.name, 'partial_game', parent.name, parents[partial_parents]))
+            valid[parent.table.name] = parents[~partial_parents]
+            failed |= partial
+        valid[table.name] = dataframe[~failed]
+    quarantine_df = pd.concat(quarantined, ignore_index=True) if quarantined else pd.DataFrame(columns=QUARANTINE_COLUMNS)
+    return [valid, quarantine_df]
@@ -0,0 +1,100 @@
+import sys
+import os
+import csv
+import json
+from sqlalchemy import create_engine
+import data
+import models
+from player_efficiency import make_session, iter_player_efficiency, iter_all_time_efficiency, RESULT_COLUMNS
+
+def to_builtin(value):
+    """Converts numpy scalars and dates to values json can write"""
+    return value.item() if hasattr(value, 'item') else str(value)
+
+def write_csv(rows, columns, stream):
+    """Writes rows to an open text stream as CSV, one row at a time.
+    Args:
+    rows: An iterable of lists of values
+    columns list: The column names, written as the header
+    stream: A text file object
+    Returns:
+    The number of rows written.
+    """
+    writer = csv.writer(stream)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+def write_jsonl(rows, columns, stream):
+    """Writes rows to an open text stream as JSON Lines, one object per row.
+    Args:
+    rows: An iterable of lists of values
+    columns list: The keys of each object
+    stream: A text file object
+    Returns:
+    The number of rows written.
+    """
+    count = 0
+    for row in rows:
+        stream.write(json.dumps(dict(zip(columns, row)), default=to_builtin) + '\n')
+        count += 1
+    return count
+
+def write_results(rows, columns, filepath):
+    """Streams rows to a file without holding them in memory.
+    Writes JSON Lines if the file ends with .jsonl and CSV otherwise.
+    Args:
+    rows: An iterable of lists of values, e.g. a generator
+    columns list: The column names
+    filepath str: The file to write. Use - to write to the standard output
+    Returns:
+    The number of rows written.
+    """
+    writer = write_jsonl if filepath.endswith('.jsonl') else write_csv
+    if filepath == '-':
+        try:
+            return writer(rows, columns, sys.stdout)
+        except BrokenPipeError:
+            #the downstream job stopped reading e.g. | head, silence the flush at exit
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 0
+    with open(filepath, 'w', newline='') as stream:
+        return writer(rows, columns, stream)
+
+def main():
+    """
+    Main File
+    Streams player efficiency or match predictions from the database to a CSV or JSON Lines file.
+    """
+    inputs = sys.argv
+    result_type = inputs[1] if len(inputs) > 1 else None
+    input_files = inputs[2:3] + (inputs[4:5] if result_type == 'predictions' else [])
+    valid_inputs = (result_type == 'efficiency' and len(inputs) in [4, 5]) or \
+                   (result_type == 'predictions' and len(inputs) == 5)
+    if valid_inputs and data.check_inputs(input_files, ['file'] * len(input_files)):
+        [database_filepath, output_filepath] = inputs[2:4]
+
+        if result_type == 'efficiency':
+            session = make_session(database_filepath, read_only=True)
+            season = int(inputs[4]) if len(inputs) == 5 else None
+            rows = iter_player_efficiency(session, season) if season else iter_all_time_efficiency(session)
+            count = write_results(rows, RESULT_COLUMNS, output_filepath)
+            session.close()
+        else:
+            engine = create_engine('sqlite:///'+database_filepath)
+            model = models.load_model(inputs[4])
+            count = write_results(models.iter_predictions(engine, model), models.PREDICTION_COLUMNS, output_filepath)
+        print(f'{count} rows written to {output_filepath}', file=sys.stderr)
+    else:
+        print('Please provide the result type (efficiency or predictions) as the first argument, ',\
+              'the filepath of the database as the second argument and the output file as the ', \
+              'third argument (.csv, .jsonl or - for the terminal). For efficiency, optionally ', \
+              'give a season as the fourth argument. For predictions, give the saved model as the ', \
+              'fourth argument. \n\nExample: python export_results.py efficiency data/mydb.db ', \
+              'efficiency.csv 2015', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,2 @@
-from models.train_classifier import load_data, parse_data
\ No newline at end of file
+from models.train_classifier import load_data, parse_data, load_model, load_metadata, iter_predictions, PREDICTION_COLUMNS
+from models.compiled_forest import CompiledForest, compiled_path
\ No newline at end of file
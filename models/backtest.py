@@ -0,0 +1,179 @@
+import sys
+import os
+import time
+import hashlib
+import inspect
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sqlalchemy import create_engine
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, brier_score_loss, log_loss
+try:
+    from models.train_classifier import check_inputs, parse_data, build_pipeline
+    from models.train_classifier import NON_FEATURE_COLUMNS, STANDINGS_COLUMNS
+except ImportError:
+    from train_classifier import check_inputs, parse_data, build_pipeline
+    from train_classifier import NON_FEATURE_COLUMNS, STANDINGS_COLUMNS
+
+#classifiers the backtest can compare, each fit inside build_pipeline
+MODEL_TYPES = {'forest': lambda: RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42),
+               'logistic': lambda: LogisticRegression(max_iter=1000)}
+#standings are known before tip off, box score features are only known once the game is played
+STANDINGS_FEATURES = [column + suffix for suffix in ['_h', '_a'] for column in STANDINGS_COLUMNS]
+FEATURE_SETS = ['all', 'standings', 'box_score']
+#game_id only grows, so every scored season lies outside the range the model was trained on
+BACKTEST_EXCLUDED_COLUMNS = ['season', 'game_id']
+
+def feature_version():
+    """Fingerprints the code that builds the features, the train_classifier module and load_features.
+    Returns:
+    A short hex string that changes whenever parse_data, its helpers or NON_FEATURE_COLUMNS change.
+    """
+    with open(inspect.getsourcefile(parse_data), 'rb') as source:
+        digest = hashlib.sha256(source.read())
+    digest.update(inspect.getsource(load_features).encode())
+    return digest.hexdigest()[:16]
+
+def load_features(engine, database_filepath, cache_dir=None):
+    """Loads the parsed game features with their season, caching them on disk for later runs.
+    The cache is keyed on the database file and feature_version, so it is rebuilt whenever
+    the database or the feature code changes.
+    Args:
+    engine SQL Alchemy create engine object to connect to a db
+    database_filepath str: Path to the database
+    cache_dir str: Directory of the cache. Default: .feature_cache next to the database
+    Returns:
+    Dataframe Pandas: The parse_data dataframe with a season column, ordered by game_id
+    """
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(database_filepath)), '.feature_cache')
+    database_stat = os.stat(database_filepath)
+    key = f'{os.path.abspath(database_filepath)}:{database_stat.st_size}:{database_stat.st_mtime_ns}:{feature_version()}'
+    cache_filepath = os.path.join(cache_dir, f'features_{hashlib.sha256(key.encode()).hexdigest()[:16]}.pkl')
+    if os.path.isfile(cache_filepath):
+        return joblib.load(cache_filepath)
+
+    dataframe = parse_data(engine)
+    seasons = pd.read_sql('SELECT id game_id, season FROM game', engine)
+    dataframe = dataframe.merge(seasons, how='left', on='game_id')
+    os.makedirs(cache_dir, exist_ok=True)
+    joblib.dump(dataframe, cache_filepath)
+    return dataframe
+
+def select_features(dataframe, feature_set='all'):
+    """Returns the names of the feature columns in a feature set.
+    Args:
+    dataframe Pandas: A dataframe returned by load_features
+    feature_set str: One of FEATURE_SETS. Default: 'all'
+    Returns:
+    A list of column names
+    """
+    features = [column for column in dataframe.columns if column not in NON_FEATURE_COLUMNS + BACKTEST_EXCLUDED_COLUMNS]
+    if feature_set == 'standings':
+        return [column for column in features if column in STANDINGS_FEATURES]
+    if feature_set == 'box_score':
+        return [column for column in features if column not in STANDINGS_FEATURES]
+    return features
+
+def calibration_error(Y, probabilities, bins=10):
+    """Computes the expected calibration error of home win probabilities.
+    Args:
+    Y numpy array: The true labels
+    probabilities numpy array: Predicted probabilities of label 1
+    bins int: Number of equal width probability bins. Default: 10
+    Returns:
+    The mean gap between predicted and observed win rates, weighted by the rows in each bin.
+    """
+    bin_ids = np.minimum((probabilities * bins).astype(int), bins - 1)
+    predicted = np.bincount(bin_ids, weights=probabilities, minlength=bins)
+    observed = np.bincount(bin_ids, weights=Y, minlength=bins)
+    return float(np.abs(predicted - observed).sum() / max(len(Y), 1))
+
+def run_fold(X, Y, seasons, test_season, model_type):
+    """Trains on every season before test_season and scores test_season.
+    Args:
+    X numpy array: Features of every game
+    Y numpy array: Labels of every game
+    seasons numpy array: Season of every game
+    test_season int: The season to score
+    model_type str: A key of MODEL_TYPES
+    Returns:
+    A dictionary of fold metrics
+    """
+    train, test = seasons < test_season, seasons == test_season
+    model = build_pipeline(MODEL_TYPES[model_type]())
+    start = time.perf_counter()
+    model.fit(X[train], Y[train])
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    probabilities = model.predict_proba(X[test])[:, list(model.classes_).index(1)]
+    predict_time = time.perf_counter() - start
+    predictions = (probabilities > 0.5).astype(int)
+    return {'season': int(test_season),
+            'train_games': int(train.sum()),
+            'test_games': int(test.sum()),
+            'accuracy': accuracy_score(Y[test], predictions),
+            'log_loss': log_loss(Y[test], probabilities, labels=[0, 1]),
+            'brier_score': brier_score_loss(Y[test], probabilities),
+            'calibration_error': calibration_error(Y[test], probabilities),
+            'fit_time': fit_time,
+            'predict_time': predict_time}
+
+def backtest(dataframe, model_type='forest', feature_set='all', min_train_seasons=1, n_jobs=-1):
+    """Walks forward season by season, training on all earlier seasons and scoring the next one.
+    Folds are trained in parallel.
+    Args:
+    dataframe Pandas: A dataframe returned by load_features
+    model_type str: A key of MODEL_TYPES. Default: 'forest'
+    feature_set str: One of FEATURE_SETS. Default: 'all'
+    min_train_seasons int: Number of seasons used for training before the first scored season. Default: 1
+    n_jobs int: Number of folds trained at once, -1 for one per cpu. Default: -1
+    Returns:
+    A pandas dataframe with one row of metrics per scored season
+    """
+    if model_type not in MODEL_TYPES:
+        raise ValueError(f'Unknown model type {model_type}. Use one of {list(MODEL_TYPES)}.')
+    if feature_set not in FEATURE_SETS:
+        raise ValueError(f'Unknown feature set {feature_set}. Use one of {FEATURE_SETS}.')
+    dataframe = dataframe.dropna(subset=['season'])
+    X = dataframe[select_features(dataframe, feature_set)].values.astype(float)
+    Y = dataframe['home_team_wins'].values
+    seasons = dataframe['season'].values
+    test_seasons = np.unique(seasons)[min_train_seasons:]
+
+    folds = Parallel(n_jobs=n_jobs)(delayed(run_fold)(X, Y, seasons, season, model_type)
+                                    for season in test_seasons)
+    return pd.DataFrame(folds)
+
+def main():
+    inputs = sys.argv
+    model_type = inputs[2] if len(inputs) > 2 else 'forest'
+    feature_set = inputs[3] if len(inputs) > 3 else 'all'
+    if (len(inputs) in [2, 3, 4]) and check_inputs(inputs[1:2], ['file']) \
+            and model_type in MODEL_TYPES and feature_set in FEATURE_SETS:
+        database_filepath = inputs[1]
+
+        print('Loading features...\n    Database: {}'.format(database_filepath))
+        engine = create_engine('sqlite:///'+database_filepath)
+        start = time.perf_counter()
+        dataframe = load_features(engine, database_filepath)
+        print(f'    {len(dataframe)} games loaded in {time.perf_counter() - start:.2f}s')
+
+        print(f'Backtesting {model_type} on {feature_set} features...')
+        start = time.perf_counter()
+        results = backtest(dataframe, model_type, feature_set)
+        pd.set_option('display.width', 200)
+        print(results.round(4).to_string(index=False))
+        print(f'Mean accuracy {results.accuracy.mean():.4f}, mean log loss {results.log_loss.mean():.4f}, '
+              f'{len(results)} folds in {time.perf_counter() - start:.2f}s')
+    else:
+        print('Please provide the filepath of the database as the first argument. '\
+              f'Optionally give the model type ({" or ".join(MODEL_TYPES)}) as the second '\
+              f'argument and the feature set ({", ".join(FEATURE_SETS)}) as the third. '\
+              '\n\nExample: python models/backtest.py data/mydb.db forest standings')
+
+if __name__ == '__main__':
+    main()
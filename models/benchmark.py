@@ -0,0 +1,122 @@
+import sys
+import os
+import json
+import subprocess
+import tempfile
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+try:
+    from models.train_classifier import check_inputs, load_data, save_model, ARTIFACT_FORMATS
+    from models.compiled_forest import CompiledForest, compiled_path
+except ImportError:
+    from train_classifier import check_inputs, load_data, save_model, ARTIFACT_FORMATS
+    from compiled_forest import CompiledForest, compiled_path
+
+#run in a fresh interpreter to time loading a model and making its first prediction
+COLD_START_SCRIPT = '''
+import sys, json, time
+import numpy as np
+from models.train_classifier import load_model
+start = time.perf_counter()
+model = load_model(sys.argv[1], compiled=sys.argv[2] == '1')
+model.predict(np.array(json.loads(sys.argv[3]), dtype=float))
+print(time.perf_counter() - start)
+'''
+
+def time_call(func, repeats):
+    """Times repeated calls of a function.
+    Args:
+    func: A function taking no arguments
+    repeats int: Number of calls to time
+    Returns:
+    The median duration of a call in seconds.
+    """
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return float(np.median(durations))
+
+def benchmark_inference(model, compiled, X, repeats=50):
+    """Compares single row and batch latency of a pickled pipeline and its CompiledForest.
+    Checks that both give the same predictions first.
+    Args:
+    model: The scikit learn pipeline
+    compiled CompiledForest: The compiled export of model
+    X numpy array: Feature rows to predict
+    repeats int: Number of timed calls for each measurement
+    Returns:
+    A pandas dataframe of median latencies in milliseconds.
+    """
+    if not np.array_equal(model.predict(X), compiled.predict(X)):
+        raise AssertionError('Compiled predictions differ from the pipeline.')
+    if not np.array_equal(model.predict_proba(X), compiled.predict_proba(X)):
+        raise AssertionError('Compiled probabilities differ from the pipeline.')
+
+    row = X[:1]
+    results = {'pipeline': [time_call(lambda: model.predict(row), repeats),
+                            time_call(lambda: model.predict(X), max(repeats // 10, 1))],
+               'compiled': [time_call(lambda: compiled.predict(row), repeats),
+                            time_call(lambda: compiled.predict(X), max(repeats // 10, 1))]}
+    results = pd.DataFrame(results, index=['single_row_ms', f'batch_{len(X)}_rows_ms']) * 1000
+    results['speedup'] = results['pipeline'] / results['compiled']
+    return results
+
+def benchmark_cold_start(model, X, repeats=5):
+    """Measures cold start, loading a model and predicting one row in a new process, for each artifact format.
+    Args:
+    model: The scikit learn pipeline
+    X numpy array: Feature rows, the first one is predicted
+    repeats int: Number of processes started for each measurement
+    Returns:
+    A pandas dataframe of median cold start times in milliseconds and artifact sizes in kilobytes.
+    """
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    row = json.dumps(np.where(np.isnan(X[:1]), None, X[:1]).tolist())
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for artifact_format in ARTIFACT_FORMATS:
+            model_filepath = os.path.join(directory, f'{artifact_format}.pkl')
+            save_model(model, model_filepath, artifact_format)
+            for compiled in [False, True]:
+                durations = []
+                for _ in range(repeats):
+                    output = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT, model_filepath, str(int(compiled)), row],
+                                            cwd=project_dir, capture_output=True, text=True, check=True).stdout
+                    durations.append(float(output.split()[-1]))
+                name = f'{artifact_format}_{"compiled" if compiled else "pipeline"}'
+                filepath = compiled_path(model_filepath) if compiled else model_filepath
+                results[name] = [np.median(durations) * 1000, os.path.getsize(filepath) / 1024]
+    return pd.DataFrame(results, index=['cold_start_ms', 'size_kb']).T
+
+def main():
+    inputs = sys.argv
+    if (len(inputs) == 3) and check_inputs(inputs[1:], ['file', 'file']):
+        database_filepath, model_filepath = inputs[1:]
+
+        print('Loading data...\n    Database: {}'.format(database_filepath))
+        engine = create_engine('sqlite:///'+database_filepath)
+        X, _ = load_data(engine)
+
+        print('Loading models...\n    MODEL: {}'.format(model_filepath))
+        model = joblib.load(model_filepath)
+        model.set_params(clf__verbose=0)
+        compiled = CompiledForest.load(compiled_path(model_filepath))
+
+        print('Benchmarking inference...')
+        print(benchmark_inference(model, compiled, X))
+
+        print('Benchmarking cold start...')
+        print(benchmark_cold_start(model, X))
+    else:
+        print('Please provide the filepath of the database '\
+              'as the first argument and the filepath of the saved model '\
+              'as the second argument. \n\nExample: python '\
+              'models/benchmark.py data/mydb.db models/classifier.pkl')
+
+if __name__ == '__main__':
+    main()
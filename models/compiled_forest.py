@@ -0,0 +1,178 @@
+import os
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import StandardScaler
+
+def compiled_path(model_filepath):
+    """Returns the file path of the compiled model saved next to a pickled model.
+    Args:
+    model_filepath str: File path of the pickled model e.g. models/classifier.pkl
+    Returns:
+    A string file path e.g. models/classifier.compiled.pkl
+    """
+    root, ext = os.path.splitext(model_filepath)
+    return f'{root}.compiled{ext or ".pkl"}'
+
+def write_atomic(filepath, write):
+    """Writes a file through a temporary file in the same directory, then renames it into place.
+    Processes that memory mapped the old file keep reading the old copy, and no reader sees a half written file.
+    Args:
+    filepath str: The file to write
+    write: A function that writes the file to the path it is given
+    """
+    temp_filepath = f'{filepath}.{os.getpid()}.tmp'
+    try:
+        write(temp_filepath)
+        os.replace(temp_filepath, filepath)
+    finally:
+        if os.path.exists(temp_filepath):
+            os.remove(temp_filepath)
+
+class CompiledForest:
+    '''A random forest pipeline flattened into contiguous numpy arrays.
+    Evaluates the imputer, the scaler and every tree of the forest for a batch of rows at once,
+    giving the same predictions as the scikit learn pipeline without its per call overhead.
+    '''
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.classes_ = arrays['classes']
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """Flattens a fitted imputer > scaler > random forest pipeline.
+        Args:
+        pipeline: A fitted scikit learn Pipeline or a grid search holding one as best_estimator_
+        Returns:
+        A CompiledForest. Raises a ValueError for any other kind of model.
+        """
+        pipeline = getattr(pipeline, 'best_estimator_', pipeline)
+        steps = [step for (_, step) in getattr(pipeline, 'steps', [])]
+        if len(steps) != 3:
+            raise ValueError('Expected an imputer, scaler and random forest pipeline.')
+        imputer, scaler, forest = steps
+        if not (isinstance(imputer, SimpleImputer) and isinstance(scaler, StandardScaler)
+                and isinstance(forest, RandomForestClassifier)):
+            raise ValueError('Expected an imputer, scaler and random forest pipeline.')
+
+        #the imputer drops columns it could not compute a statistic for
+        keep = ~np.isnan(imputer.statistics_)
+        if getattr(imputer, 'keep_empty_features', False):
+            keep[:] = True
+        n_features = int(keep.sum())
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+
+        features, thresholds, children, leaves, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(tree.node_count)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            #children of node i sit at 2i (right) and 2i + 1 (left), indexed by the split outcome
+            children.append(np.column_stack([np.where(is_leaf, node_ids, tree.children_right),
+                                             np.where(is_leaf, node_ids, tree.children_left)]).ravel() + offset)
+            leaves.append(is_leaf)
+            value = tree.value[:, 0, :forest.n_classes_]
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+            roots.append(offset)
+            offset += tree.node_count
+
+        arrays = {'impute_columns': np.flatnonzero(keep),
+                  'impute_values': np.ascontiguousarray(imputer.statistics_[keep], dtype=np.float64),
+                  'scale_mean': np.ascontiguousarray(mean, dtype=np.float64),
+                  'scale_scale': np.ascontiguousarray(scale, dtype=np.float64),
+                  'feature': np.concatenate(features).astype(np.intp),
+                  'threshold': np.concatenate(thresholds).astype(np.float64),
+                  'children': np.concatenate(children).astype(np.intp),
+                  'is_leaf': np.concatenate(leaves),
+                  'value': np.concatenate(values).astype(np.float64),
+                  'roots': np.array(roots, dtype=np.intp),
+                  'classes': forest.classes_}
+        return cls(arrays)
+
+    def transform(self, X):
+        """Applies the imputer and the scaler.
+        Args:
+        X numpy array: Raw feature rows
+        Returns:
+        A float32 numpy array, the dtype the forest compares thresholds against.
+        """
+        arrays = self.arrays
+        X = np.array(X, dtype=np.float64, ndmin=2)[:, arrays['impute_columns']]
+        missing = np.isnan(X)
+        if missing.any():
+            X[missing] = np.broadcast_to(arrays['impute_values'], X.shape)[missing]
+        X -= arrays['scale_mean']
+        X /= arrays['scale_scale']
+        return X.astype(np.float32)
+
+    def apply(self, X):
+        """Walks every tree at once for a batch of rows.
+        Each step advances all (tree, row) pairs still on a split node, so work shrinks as rows reach leaves.
+        Args:
+        X numpy array: Rows returned by transform
+        Returns:
+        A numpy array of shape (n_trees, n_rows) holding the leaf reached in each tree.
+        """
+        arrays = self.arrays
+        n_rows, n_features = X.shape
+        values = X.ravel()
+        nodes = np.repeat(arrays['roots'], n_rows)
+        row_starts = np.tile(np.arange(n_rows) * n_features, len(arrays['roots']))
+        active = np.flatnonzero(~arrays['is_leaf'][nodes])
+        while active.size:
+            current = nodes[active]
+            go_left = values[row_starts[active] + arrays['feature'][current]] <= arrays['threshold'][current]
+            current = arrays['children'][2 * current + go_left]
+            nodes[active] = current
+            active = active[~arrays['is_leaf'][current]]
+        return nodes.reshape(len(arrays['roots']), n_rows)
+
+    def predict_proba(self, X):
+        """Predicts class probabilities, averaging the trees in the same order as scikit learn.
+        Args:
+        X numpy array: Raw feature rows
+        Returns:
+        A numpy array of shape (n_rows, n_classes)
+        """
+        leaves = self.apply(self.transform(X))
+        leaf_values = self.arrays['value'][leaves]
+        proba = np.zeros(leaf_values.shape[1:])
+        for tree_values in leaf_values:
+            proba += tree_values
+        proba /= leaves.shape[0]
+        return proba
+
+    def predict(self, X):
+        """Predicts the class of each row.
+        Args:
+        X numpy array: Raw feature rows
+        Returns:
+        A numpy array of class labels
+        """
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def save(self, filepath):
+        """Saves the arrays uncompressed so they can be memory mapped on load.
+        Replaces an existing file atomically, so processes still using it are unaffected.
+        Args:
+        filepath str: File path to save the compiled model to
+        """
+        write_atomic(filepath, lambda temp_filepath: joblib.dump(self.arrays, temp_filepath))
+
+    @classmethod
+    def load(cls, filepath, mmap_mode=None):
+        """Loads a compiled model saved with save.
+        Args:
+        filepath str: File path of the compiled model
+        mmap_mode str: Passed to joblib.load e.g. 'r' to page arrays in lazily. Default: None
+        Returns:
+        A CompiledForest
+        """
+        return cls(joblib.load(filepath, mmap_mode=mmap_mode))
@@ -1,9 +1,12 @@
 import sys
 import os
+import json
+import hashlib
 import joblib
 import time
 import pandas as pd
 import numpy as np
+from sklearn.base import clone
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.preprocessing import StandardScaler
 from sklearn.impute import SimpleImputer
@@ -12,6 +15,24 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, f1_score
 from sqlalchemy import create_engine
 from os import path
+try:
+    from models.compiled_forest import CompiledForest, compiled_path, write_atomic
+except ImportError:
+    from compiled_forest import CompiledForest, compiled_path, write_atomic
+
+#standings attached to each side of a game by add_standings_features
+STANDINGS_COLUMNS = ['games_played', 'wins', 'loses', 'win_pct',
+                     'home_wins', 'home_loses', 'road_wins', 'road_loses']
+#columns of the parsed data that are not model features
+NON_FEATURE_COLUMNS = ['index_h','index_a','team_id_h','team_id_a','points_h', 'points_a','home_team_wins','game_date_est']
+#columns of the rows yielded by iter_predictions
+PREDICTION_COLUMNS = ['game_id', 'team_id_h', 'team_id_a', 'home_team_wins', 'predicted_home_team_wins', 'home_win_probability']
+#trees grown on the new games by each incremental refresh
+REFRESH_TREES = 10
+#refreshes after which the forest is refit on every game instead, so small sample trees never outvote it
+MAX_REFRESHES = 7
+#'compressed' is smallest on disk, 'mmap' is uncompressed so the compiled export is memory mapped on load
+ARTIFACT_FORMATS = ['compressed', 'mmap']
 
 def is_path(filepath, checktype='dir'):
     """Checks if a path or directory exists.
@@ -46,13 +67,87 @@ def check_inputs(inputs, file_types):
             return False
     return True
 
-def parse_data(engine, random=False, ret_team_names=False):
+def parse_record(records):
+    """Parses a column of "W-L" record strings into numeric wins and loses.
+    Args:
+    records pandas.Series: A series of record strings e.g. '21-9'
+    Returns:
+    Dataframe Pandas: A dataframe with float columns wins and loses. Malformed records are NaN.
+    """
+    #a season only has a few thousand distinct records, so parse each once and map them back by code
+    codes, uniques = pd.factorize(records)
+    parsed = pd.Series(uniques, dtype=object).str.split('-', n=1, expand=True).reindex(columns=[0, 1])
+    parsed = parsed.apply(pd.to_numeric, errors='coerce').astype(float).values
+    parsed = np.vstack([parsed, [np.nan, np.nan]])[codes]
+    return pd.DataFrame(parsed, index=records.index, columns=['wins', 'loses'])
+
+def load_standings(engine, team_ids=None, before=None):
+    """Loads the daily team standings from the ranking table.
+    Args:
+    engine SQL Alchemy create engine object to connect to a db
+    team_ids list: If set, only loads standings for these teams
+    before str: A date string in the format %Y-%m-%d. If set, only loads standings dated before this day
+    Returns:
+    Dataframe Pandas: Standings sorted by standings_date with one row per team and day.
+    Columns are team_id, standings_date and the STANDINGS_COLUMNS values.
+    """
+    filters = []
+    if team_ids is not None:
+        filters.append('team_id IN ({})'.format(','.join(str(int(team_id)) for team_id in team_ids)))
+    if before is not None:
+        filters.append(f"standings_date < '{before}'")
+    where = f"WHERE {' AND '.join(filters)}" if filters else ''
+    standings = pd.read_sql(f'''SELECT team_id, season_id, standings_date, games games_played,
+                wins, loses, home_record, road_record FROM ranking {where}''', engine)
+    standings['standings_date'] = pd.to_datetime(standings['standings_date'])
+
+    home = parse_record(standings.pop('home_record'))
+    road = parse_record(standings.pop('road_record'))
+    standings['home_wins'], standings['home_loses'] = home['wins'], home['loses']
+    standings['road_wins'], standings['road_loses'] = road['wins'], road['loses']
+    standings['win_pct'] = standings['wins'] / standings['games_played'].where(standings['games_played'] > 0)
+
+    #a team can hold rows for two seasons on the same day, keep the latest season
+    standings = standings.sort_values(['standings_date', 'season_id'], kind='mergesort')
+    standings = standings.drop_duplicates(['team_id', 'standings_date'], keep='last')
+    return standings[['team_id', 'standings_date'] + STANDINGS_COLUMNS].reset_index(drop=True)
+
+def add_standings_features(dataframe, games, standings):
+    """Attaches the home and away team standings as of the day before each game.
+    Uses a sorted as-of join per team, so each game picks the latest standings dated strictly before it.
+    Args:
+    dataframe Pandas: Joined game stats with game_id, team_id_h and team_id_a columns
+    games Pandas: Games with id and game_date_est columns
+    standings Pandas: Standings as returned by load_standings
+    Returns:
+    Dataframe Pandas: The input dataframe in game_id order with game_date_est and STANDINGS_COLUMNS added
+    for each side (suffixes _h, _a)
+    """
+    dates = games[['id', 'game_date_est']].rename(columns={'id': 'game_id'})
+    dates['game_date_est'] = pd.to_datetime(dates['game_date_est'])
+    dataframe = dataframe.merge(dates, how='left', on='game_id')
+    dataframe = dataframe.sort_values('game_date_est', kind='mergesort')
+
+    for suffix in ['_h', '_a']:
+        side = standings.rename(columns={column: column + suffix for column in ['team_id'] + STANDINGS_COLUMNS})
+        side[f'team_id{suffix}'] = side[f'team_id{suffix}'].astype(dataframe[f'team_id{suffix}'].dtype)
+        dataframe = pd.merge_asof(dataframe, side, left_on='game_date_est', right_on='standings_date',
+                                  by=f'team_id{suffix}', allow_exact_matches=False)
+        dataframe = dataframe.drop(columns=['standings_date'])
+
+    dataframe = dataframe.sort_values('game_id', kind='mergesort')
+    return dataframe.reset_index(drop=True)
+
+def parse_data(engine, random=False, ret_team_names=False, since=None, since_ids=None):
     """Parses data from the database and return a joined daframe of parsed game stats
     Args:
     engine SQL Alchemy create engine object to connect to a db
     random If random, parses database for information on only one game:
     ret_team_names If True, parses database for information on team_names and returns a list
                List holds [home_team_name, away_team_name]
+    since str: A date string in the format %Y-%m-%d. If set, only parses games played after this day
+    since_ids list: Ids of games played on the since day that were already parsed. If set, the other games
+               of that day are parsed too, e.g. games loaded after a run partway through the day
     Returns:
     Dataframe Pandas: A pandas dataframe containing information for a give game
     A List: Returns a tuple of (dataframe, home_team__name, away_team__name) if ret_team_names flag is triggered.
@@ -69,27 +164,28 @@ def parse_data(engine, random=False, ret_team_names=False):
                 GROUP BY game_id, team_id
                 ORDER BY game_id;''', engine)
     else:
-        games = pd.read_sql('SELECT * FROM game ORDER BY id', engine)
-        team_stats = pd.read_sql('''SELECT game_id, team_id,
+        game_filter = f"WHERE game_date_est >= date('{since}', '+1 day')" if since else ''
+        if since and since_ids is not None:
+            game_filter = f'''WHERE game_date_est >= date('{since}', '+1 day') OR (game_date_est >= date('{since}')
+                              AND id NOT IN ({','.join(str(int(game_id)) for game_id in since_ids) or 'NULL'}))'''
+        stats_filter = f'WHERE game_id IN (SELECT id FROM game {game_filter})' if since else ''
+        games = pd.read_sql(f'SELECT * FROM game {game_filter} ORDER BY id', engine)
+        team_stats = pd.read_sql(f'''SELECT game_id, team_id,
                     SUM(assist) assist,
                     SUM(field_g_made) / SUM(field_g_attempts) field_g_pct,
                     SUM(field_g3_made) / SUM(field_g3_attempts) field_g3_pct,
                     SUM(free_throws_made) / SUM(free_throw_attempts) free_throw_pct,
                     SUM(off_rebound) + SUM(def_rebound) rebound,
-                    SUM(points) points FROM statistics
+                    SUM(points) points FROM statistics {stats_filter}
                     GROUP BY game_id, team_id
                     ORDER BY game_id;''', engine)
-    home_team_ls = []
-    for (_, items) in team_stats[['game_id','team_id']].iterrows():
-        game_id = items[0]
-        team_id = items[1]
-        game = games[games['id'] == game_id]
-        if game.shape[0] > 0:
-            home_team_ls.append((game['home_team_id'] == team_id).sum())
-        else: 
-            home_team_ls.append(np.nan)
-
-    team_stats['home_team'] = home_team_ls
+    #count the games each team row is the home team of, NaN when the game is missing
+    matches = team_stats[['game_id','team_id']].reset_index().merge(games[['id','home_team_id']], how='left',
+                                                                    left_on='game_id', right_on='id')
+    matches['is_home'] = (matches['home_team_id'] == matches['team_id']).astype(int)
+    home_counts = matches.groupby('index')['is_home'].sum()
+    home_counts[matches.groupby('index')['id'].count() == 0] = np.nan
+    team_stats['home_team'] = home_counts
     
     home_team = team_stats[team_stats['home_team']==1].drop(columns=['home_team']).reset_index()
     away_team = team_stats[team_stats['home_team']==0].drop(columns=['home_team']).reset_index()
@@ -97,11 +193,17 @@ def parse_data(engine, random=False, ret_team_names=False):
     joined_data = home_team.merge(away_team, how='inner', left_on='game_id',
                               right_on='game_id', suffixes = ('_h', '_a'))
     joined_data['home_team_wins'] = (joined_data['points_h'] > joined_data['points_a']).astype(int)
-    dataframe = joined_data.copy()
+
+    if random:
+        game_date = pd.Timestamp(games.game_date_est[0]).strftime('%Y-%m-%d')
+        standings = load_standings(engine, team_ids=games[['home_team_id', 'visitor_team_id']].values[0], before=game_date)
+    else:
+        standings = load_standings(engine)
+    dataframe = add_standings_features(joined_data, games, standings)
 
     if ret_team_names:
-        team_home = pd.read_sql(f'''SELECT nickname from team WHERE id={dataframe.id_h[0]}''', engine)['nickname'][0]
-        team_away = pd.read_sql(f'''SELECT nickname from team WHERE id={dataframe.id_a[0]}''', engine)['nickname'][0]
+        team_home = pd.read_sql(f'''SELECT nickname from team WHERE id={dataframe.team_id_h[0]}''', engine)['nickname'][0]
+        team_away = pd.read_sql(f'''SELECT nickname from team WHERE id={dataframe.team_id_a[0]}''', engine)['nickname'][0]
         return dataframe, team_home, team_away
     return dataframe
 
@@ -120,17 +222,56 @@ def load_data(engine, random=False, ret_team_names=False):
     else:
         dataframe = parse_data(engine, random=random, ret_team_names=ret_team_names)
 
-    X = dataframe.drop(columns = ['index_h','index_a','team_id_h','team_id_a','points_h', 'points_a','home_team_wins']).values
+    X = dataframe.drop(columns=NON_FEATURE_COLUMNS).values
     Y = dataframe['home_team_wins'].values
     if ret_team_names:
         return X, Y, home, away
     return X, Y
 
-def build_model(classifier, parameters):
+def data_fingerprint(dataframe):
+    """Summarises the data a model is trained on, so a saved model can be traced back to it.
+    Args:
+    dataframe Pandas: A dataframe returned by parse_data
+    Returns:
+    A dictionary with the feature names, row count, last game id and date, the ids of the games played on
+    that date and a sha256 of the feature and target values.
     """
-    Builds a multioutput text classifcation model. 
+    X = dataframe.drop(columns=NON_FEATURE_COLUMNS)
+    digest = hashlib.sha256(np.ascontiguousarray(X.values, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(dataframe['home_team_wins'].values, dtype=np.int64).tobytes())
+    last_game_date = dataframe['game_date_est'].max().normalize() if len(dataframe) else None
+    return {'features': list(X.columns),
+            'rows': int(len(dataframe)),
+            'last_game_id': int(dataframe['game_id'].max()) if len(dataframe) else None,
+            'last_game_date': last_game_date.strftime('%Y-%m-%d') if len(dataframe) else None,
+            'last_date_game_ids': sorted(dataframe.loc[dataframe['game_date_est'] >= last_game_date, 'game_id'].astype(int).tolist())
+                                  if len(dataframe) else [],
+            'sha256': digest.hexdigest()}
+
+def iter_predictions(engine, model, chunksize=1000):
+    """Predicts every game in the database, yielding rows chunk by chunk so they can be streamed to a file.
+    Args:
+    engine SQL Alchemy create engine object to connect to a db
+    model: A model returned by load_model
+    chunksize int: Number of games predicted per call to the model. Default: 1000
+    Yields:
+    A list of values in the order of PREDICTION_COLUMNS
+    """
+    dataframe = parse_data(engine)
+    X = dataframe.drop(columns=NON_FEATURE_COLUMNS).values
+    home_win = list(model.classes_).index(1)
+    for start in range(0, len(dataframe), chunksize):
+        chunk = dataframe.iloc[start:start+chunksize]
+        proba = model.predict_proba(X[start:start+chunksize])
+        predictions = model.classes_.take(np.argmax(proba, axis=1))
+        yield from map(list, zip(chunk['game_id'].tolist(), chunk['team_id_h'].tolist(), chunk['team_id_a'].tolist(),
+                                 chunk['home_team_wins'].tolist(), predictions.tolist(), proba[:, home_win].tolist()))
+
+def build_pipeline(classifier):
+    """
+    Builds the imputer > scaler > classifier pipeline used by every model.
     Returns:
-    A grid search multiclassification model with a randomforest estimator as base
+    An unfitted scikit learn Pipeline
     """
     scaler = StandardScaler()
     imputer = SimpleImputer(missing_values=np.nan, strategy='median')
@@ -138,6 +279,15 @@ def build_model(classifier, parameters):
                          ('scaler', scaler),
                          ('clf', classifier)
                         ])
+    return pipeline
+
+def build_model(classifier, parameters):
+    """
+    Builds a multioutput text classifcation model. 
+    Returns:
+    A grid search multiclassification model with a randomforest estimator as base
+    """
+    pipeline = build_pipeline(classifier)
     model = GridSearchCV(pipeline, parameters, verbose=1)
     
     return model
@@ -165,30 +315,165 @@ def evaluate_model(model, X_train, X_test, Y_train, Y_test):
 
     grid_results = pd.DataFrame(eval)
     print(grid_results)
+    return {key: float(value[0]) for (key, value) in eval.items()}
 
-def save_model(model, model_filepath='models/classifier.pkl'):
+def metadata_path(model_filepath):
+    """Returns the file path of the metadata sidecar of a saved model e.g. models/classifier.meta.json"""
+    return os.path.splitext(model_filepath)[0] + '.meta.json'
+
+def load_metadata(model_filepath):
+    """Loads the metadata sidecar of a saved model.
+    Args:
+    model_filepath str: File path of the saved model
+    Returns:
+    A dictionary. Empty if the model was saved without a sidecar.
+    """
+    if not os.path.isfile(metadata_path(model_filepath)):
+        return {}
+    with open(metadata_path(model_filepath)) as sidecar:
+        return json.load(sidecar)
+
+def save_model(model, model_filepath='models/classifier.pkl', artifact_format='compressed', metadata=None):
     """Saves an ML model to the the filepath. Extracts and saves the best estimator if presented with a grid search model. Saves file name is 'classifier.pkl'.
+    Also exports the model as a CompiledForest next to it (see compiled_path) for fast inference,
+    skipped for models CompiledForest does not support, and writes a metadata sidecar (see metadata_path).
     
     Args:
     model A model to save
     model_filepath str: File path to save the model to. (If filepath does not exist, will save to the model to the same folder as the train_classifier script).
+    artifact_format str: One of ARTIFACT_FORMATS. 'mmap' saves uncompressed so load_model can memory map the compiled arrays. Default: 'compressed'
+    metadata dict: Extra values for the sidecar e.g. the data_fingerprint and evaluation metrics
     """
+    if artifact_format not in ARTIFACT_FORMATS:
+        raise ValueError(f'Unknown artifact format {artifact_format}. Use one of {ARTIFACT_FORMATS}.')
     try:
         best_model = model.best_estimator_
     except:
         best_model = model
-    joblib.dump(best_model, model_filepath, compress=True)
+    #every file is replaced atomically, a process serving the memory mapped model must never see it change underneath
+    write_atomic(model_filepath, lambda filepath: joblib.dump(best_model, filepath, compress=(artifact_format == 'compressed')))
+
+    try:
+        compiled = CompiledForest.from_pipeline(best_model)
+    except ValueError as error:
+        #load_model falls back to the pipeline, so drop any export left by an earlier model
+        print(f'Skipping the compiled export: {error}')
+        compiled = None
+        if os.path.isfile(compiled_path(model_filepath)):
+            os.remove(compiled_path(model_filepath))
+    if compiled is not None:
+        compiled.save(compiled_path(model_filepath))
+
+    sidecar = dict(metadata or {})
+    sidecar['format'] = artifact_format
+    sidecar['compiled'] = compiled is not None
+    sidecar['saved_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    def write_sidecar(filepath):
+        with open(filepath, 'w') as sidecar_file:
+            json.dump(sidecar, sidecar_file, indent=2)
+    write_atomic(metadata_path(model_filepath), write_sidecar)
     
     print('Saved Successfully!')
 
+def load_model(model_filepath, compiled=True):
+    """Loads a model saved with save_model, memory mapping its arrays if it was saved in the 'mmap' format.
+    Only the CompiledForest arrays stay mapped and shared between processes, scikit learn copies the
+    tree arrays of the pipeline into private memory while unpickling them.
+    Args:
+    model_filepath str: File path of the saved model
+    compiled bool: If True, loads the compiled export when it exists. Default: True
+    Returns:
+    A CompiledForest or the scikit learn pipeline. Both provide predict and predict_proba.
+    """
+    mmap_mode = 'r' if load_metadata(model_filepath).get('format') == 'mmap' else None
+    if compiled and os.path.isfile(compiled_path(model_filepath)):
+        return CompiledForest.load(compiled_path(model_filepath), mmap_mode=mmap_mode)
+    return joblib.load(model_filepath, mmap_mode=mmap_mode)
+
+def refresh_model(engine, model_filepath, artifact_format=None, new_trees=REFRESH_TREES, max_refreshes=MAX_REFRESHES):
+    """Updates a saved model with the games played since it was last trained, without a grid search.
+    Keeps the fitted imputer and scaler and grows the forest with new_trees warm started trees fit on the new games.
+    Every max_refreshes refreshes, the pipeline is instead refit on every game with its tuned parameters,
+    which bounds the forest at the tuned size plus max_refreshes * new_trees trees.
+    Args:
+    engine SQL Alchemy create engine object to connect to a db
+    model_filepath str: File path of a model saved by save_model with its metadata sidecar
+    artifact_format str: One of ARTIFACT_FORMATS. Default: the format the model was saved in
+    new_trees int: Number of trees added to the forest. Default: REFRESH_TREES
+    max_refreshes int: Number of warm started refreshes between refits. Default: MAX_REFRESHES
+    Returns:
+    A boolean value: True if the model was refreshed and saved, False if there was nothing to learn from.
+    """
+    metadata = load_metadata(model_filepath)
+    since = metadata['data']['last_game_date']
+    #games of the last day loaded after the model was trained are still new, sidecars older than the ids skip the day
+    since_ids = metadata['data'].get('last_date_game_ids')
+    print(f'Loading games played after {since}' + (' or loaded since on that day...' if since_ids is not None else '...'))
+    dataframe = parse_data(engine, since=since, since_ids=since_ids)
+    if dataframe['home_team_wins'].nunique() < 2:
+        print(f'{len(dataframe)} new games. Need home wins and losses to refresh, keeping the current model.')
+        return False
+    X = dataframe.drop(columns=NON_FEATURE_COLUMNS)
+    if list(X.columns) != metadata['data']['features']:
+        raise ValueError('The features changed since the model was trained. Retrain it with --full.')
+    X, Y = X.values, dataframe['home_team_wins'].values
+
+    pipeline = joblib.load(model_filepath)
+    print(f'Scoring the current model on {len(dataframe)} new games...')
+    predictions = pipeline.predict(X)
+    metrics = {'new_games': int(len(dataframe)),
+               'pre_refresh_acc_score': float(accuracy_score(Y, predictions)),
+               'pre_refresh_f1_score': float(f1_score(Y, predictions))}
+
+    refreshes = metadata.setdefault('refreshes', [])
+    refits = [i for (i, refresh) in enumerate(refreshes) if refresh.get('refit')]
+    since_refit = len(refreshes) - (refits[-1] + 1 if refits else 0)
+    forest = pipeline.named_steps['clf']
+    fingerprint = data_fingerprint(dataframe)
+    if since_refit >= max_refreshes:
+        tuned_trees = int(metadata.get('params', {}).get('clf__n_estimators', len(forest.estimators_) - new_trees * since_refit))
+        print(f'Refitting the pipeline with {tuned_trees} trees on every game...')
+        dataframe = parse_data(engine)
+        pipeline = clone(pipeline).set_params(clf__n_estimators=tuned_trees, clf__warm_start=False)
+        pipeline.fit(dataframe.drop(columns=NON_FEATURE_COLUMNS).values, dataframe['home_team_wins'].values)
+        forest = pipeline.named_steps['clf']
+        metadata['data'] = data_fingerprint(dataframe)
+    else:
+        print(f'Growing the forest from {len(forest.estimators_)} to {len(forest.estimators_) + new_trees} trees...')
+        forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + new_trees)
+        forest.fit(pipeline[:-1].transform(X), Y)
+        forest.set_params(warm_start=False)
+        #the model now fits the earlier data and the new games, chain the digests of both
+        if fingerprint['last_game_date'] == since:
+            fingerprint['last_date_game_ids'] = sorted(set(since_ids or []) | set(fingerprint['last_date_game_ids']))
+        metadata['data'].update({'rows': metadata['data']['rows'] + fingerprint['rows'],
+                                 'last_game_id': max(metadata['data']['last_game_id'] or 0, fingerprint['last_game_id']),
+                                 'last_game_date': fingerprint['last_game_date'],
+                                 'last_date_game_ids': fingerprint['last_date_game_ids'],
+                                 'sha256': hashlib.sha256((metadata['data']['sha256'] + fingerprint['sha256']).encode()).hexdigest()})
+    refreshes.append(dict(metrics, refit=since_refit >= max_refreshes, trees=len(forest.estimators_),
+                          data_sha256=fingerprint['sha256'], last_game_date=fingerprint['last_game_date']))
+    save_model(pipeline, model_filepath, artifact_format or metadata.get('format', 'compressed'), metadata)
+    return True
+
 def main():
-    inputs = sys.argv
-    if (len(inputs) == 3) and check_inputs(inputs[1:-1], ['file']):
-        database_filepath, model_filepath = inputs[1:]
+    full_search = '--full' in sys.argv
+    inputs = [arg for arg in sys.argv if arg != '--full']
+    artifact_format = inputs[3] if len(inputs) == 4 else None
+    if (len(inputs) in [3, 4]) and check_inputs(inputs[1:2], ['file']) and artifact_format in ARTIFACT_FORMATS + [None]:
+        database_filepath, model_filepath = inputs[1:3]
+        engine = create_engine('sqlite:///'+database_filepath)
+
+        if not full_search and os.path.isfile(model_filepath) and load_metadata(model_filepath).get('data', {}).get('last_game_date'):
+            print('Refreshing model...\n    Database: {}\n    MODEL: {}'.format(database_filepath, model_filepath))
+            if refresh_model(engine, model_filepath, artifact_format):
+                print('Refreshed model saved!')
+            return
         
         print('Loading data...\n    Database: {}'.format(database_filepath))
-        engine = create_engine('sqlite:///'+database_filepath)
-        X, Y = load_data(engine)
+        dataframe = parse_data(engine)
+        X = dataframe.drop(columns=NON_FEATURE_COLUMNS).values
+        Y = dataframe['home_team_wins'].values
 
         X_train, X_test, y_train, y_test = train_test_split(X, Y, test_size=0.3, random_state=42)
         
@@ -205,18 +490,22 @@ def main():
         model.fit(X_train, y_train)
         
         print('Evaluating model...')
-        evaluate_model(model, X_train, X_test, y_train, y_test)
+        metrics = evaluate_model(model, X_train, X_test, y_train, y_test)
 
         print('Saving model...\n    MODEL: {}'.format(model_filepath))
-        save_model(model, model_filepath)
+        metadata = {'data': data_fingerprint(dataframe), 'metrics': metrics,
+                    'params': {key: str(value) for (key, value) in model.best_params_.items()}}
+        save_model(model, model_filepath, artifact_format or 'compressed', metadata)
 
         print('Trained model saved!')
 
     else:
         print('Please provide the filepath of the database '\
               'as the first argument and the filepath of the pickle file to '\
-              'save the model to as the second argument. \n\nExample: python '\
-              'models/train_classifier.py data/my_db.db classifier.pkl '\
+              'save the model to as the second argument. Optionally pass the artifact '\
+              f'format ({" or ".join(ARTIFACT_FORMATS)}) as the third argument. If the model '\
+              'was trained before, it is refreshed with the new games unless --full is passed. '\
+              '\n\nExample: python models/train_classifier.py data/my_db.db classifier.pkl mmap --full '\
               'and ascertain the database exists and the save path exists.')
 
 if __name__ == '__main__':
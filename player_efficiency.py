@@ -1,19 +1,31 @@
 import sys
+import os
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import desc, between, func
+from sqlalchemy import func, case, cast, Float
 from sqlalchemy.pool import NullPool
 import data
 
-def make_session(database_filepath):
+#columns of the rows returned by calc_player_efficiency
+RESULT_COLUMNS = ['player_name','player_id','efficiency','week_start','week_end']
+#metrics calc_leaderboards can rank players by
+LEADERBOARD_METRICS = ['efficiency', 'efficiency_per_minute', 'points', 'rebounds']
+
+def make_session(database_filepath, read_only=False):
     """
     Creates a session connection to a db with sql alchemy
     Args:
     database_filepath: Path to the database
+    read_only Bool: If True, opens the database in read only mode. Default: False
     """
-    engine = create_engine('sqlite:///'+database_filepath, poolclass=NullPool)
+    if read_only:
+        engine = create_engine(f'sqlite:///file:{database_filepath}?mode=ro&uri=true', poolclass=NullPool)
+    else:
+        engine = create_engine('sqlite:///'+database_filepath, poolclass=NullPool)
     data.Base.metadata.bind = engine
     database = sessionmaker(bind=engine)
     session = database()
@@ -21,31 +33,35 @@ def make_session(database_filepath):
 
 def get_weeks(session, season=None):
     """
-    Calculates the spread of weeks over a givem period or over all seasons
+    Reads the weeks of a season or of all seasons from the calendar table
     Args:
     session: An SQL alchemy session object
     season str:  A season/year in string format'.
-    If not sets dates 
+    If not set, reads every week
     Returns:
-    Weeks : pandas Index of dates.
-            An iterable of string dates [date1, date2, date3....]
-    The string is a date in the format %Y-%m-%d representing the start of a new week.
-    """
-    if (season is None):
-        query = session.query(data.Game, func.min(data.Game.game_date_est).label('min'), \
-                                          func.max(data.Game.game_date_est).label('max'))\
-                                          .first()
-        dates = [query.min, query.max]
-        weeks = pd.date_range(*dates,freq="W").strftime('%Y-%m-%d')
-    else:
-        query = session.query(data.Game, func.min(data.Game.game_date_est).label('min'), \
-                                          func.max(data.Game.game_date_est).label('max'))\
-                                        .filter(data.Game.season==season) \
-                                        .first()
-        dates = [query.min, query.max]
-        weeks = pd.date_range(*dates, freq="W").strftime('%Y-%m-%d')
+    Weeks : A pandas Dataframe ordered by week_id with columns week_id, week_start, week_end, season and season_week.
+    week_start and week_end are the Sundays starting the week and the next week, in the format %Y-%m-%d.
+    """
+    query = session.query(data.Calendar).order_by(data.Calendar.week_id)
+    if season is not None:
+        query = query.filter(data.Calendar.season==season)
+    weeks = pd.read_sql(query.statement, session.bind)
+    for column in ['week_start', 'week_end']:
+        weeks[column] = pd.to_datetime(weeks[column]).dt.strftime('%Y-%m-%d')
     return weeks
 
+def iter_player_efficiency(session, season=None):
+    """Connects to a database and yields the most efficient player of each week as it is computed.
+    Args:
+    session: An SQL alchemy session object
+    season str:  A year in string format
+    Yields:
+    result : A list of values in the order of RESULT_COLUMNS
+    """
+    leaders = calc_leaderboards(session, k=1, metrics=['efficiency'], season=season)
+    for leader in leaders.itertuples(index=False):
+        yield [leader.player_name, leader.player_id, round(leader.value, 2), leader.week_start, leader.week_end]
+
 def calc_player_efficiency(session, season=None, print_result=True):
     """Connects to a database and queries for player efficiency.
     Args:
@@ -53,53 +69,267 @@ def calc_player_efficiency(session, season=None, print_result=True):
     season str:  A year in string format
     print_result Bool: True of False. Determines if a command is printed to the screen
     Returns:
-    result : A pandas Dataframe: A dataframe containing efficiency results
+    result : A list of the column names followed by the result rows
     """
-    weeks = get_weeks(session, season)
-    results = ['player_id','efficiency','player_name','week_start','week_end']
+    return collect_results(iter_player_efficiency(session, season), print_result)
+
+def get_seasons(session):
+    """
+    Lists the seasons in the games table
+    Args:
+    session: An SQL alchemy session object
+    Returns:
+    A sorted list of seasons e.g. [2003, 2004, ...]
+    """
+    query = session.query(data.Game.season).distinct().order_by(data.Game.season)
+    return [season for (season,) in query if season is not None]
+
+def calc_season_efficiency(database_filepath, season):
+    """
+    Calculates the weekly efficiency leaders of one season on its own read only connection.
+    Used by iter_all_time_efficiency to run each season in a separate worker process.
+    Args:
+    database_filepath str: Path to the database
+    season int: The season to calculate
+    Returns:
+    A list of result rows in week order, without the column names.
+    """
+    session = make_session(database_filepath, read_only=True)
+    try:
+        return list(iter_player_efficiency(session, season))
+    finally:
+        session.close()
+
+def iter_all_time_efficiency(session, workers=None):
+    """Yields the efficiency leader of every week of every season, running the seasons in parallel.
+    Each worker opens its own read only connection. A season is yielded as soon as it and all
+    earlier seasons are done, so the rows stay in week order.
+    Args:
+    session: An SQL alchemy session object. Its database is shared with the workers
+    workers int: Number of worker processes. Default: one per season up to the number of cpus
+    Yields:
+    result : A list of values in the order of RESULT_COLUMNS
+    """
+    database_filepath = session.get_bind().url.database
+    if database_filepath.startswith('file:'):
+        database_filepath = database_filepath[len('file:'):]
+    seasons = get_seasons(session)
+    if not seasons:
+        return
+    workers = workers or min(len(seasons), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for season_results in executor.map(partial(calc_season_efficiency, database_filepath), seasons):
+            yield from season_results
+
+def calc_all_time_efficiency(session, workers=None, print_result=True):
+    """Calculates player efficiency for every week of every season, running the seasons in parallel.
+    Args:
+    session: An SQL alchemy session object. Its database is shared with the workers
+    workers int: Number of worker processes. Default: one per season up to the number of cpus
+    print_result Bool: True of False. Determines if a command is printed to the screen
+    Returns:
+    result : A list of the column names followed by the result rows, as calc_player_efficiency
+    """
+    return collect_results(iter_all_time_efficiency(session, workers), print_result)
+
+def collect_results(rows, print_result=True):
+    """
+    Collects result rows into a list headed by RESULT_COLUMNS, printing each row as it arrives
+    Args:
+    rows: An iterable of result rows
+    print_result Bool: True of False. Determines if a command is printed to the screen
+    Returns:
+    result : A list of the column names followed by the result rows
+    """
+    results = [RESULT_COLUMNS]
     if print_result:
-        show_results(results)
-    for idx in range(len(weeks)-1):
-        best_play = calc_best_play(session, weeks[idx], weeks[idx+1])
-        #expect error when team or result defaults
-        if best_play != None:
-            player_info = session.query(data.Player).filter(data.Player.id==best_play.player_id).first()
-            player_name = player_info.player_name if player_info else 'Name Unknown'
-            result = [player_name, best_play.player_id, best_play.efficiency, weeks[idx], weeks[idx+1]]
-            if print_result:
-                show_results(result)
-            results.append(result)
+        show_results(RESULT_COLUMNS)
+    for result in rows:
+        if print_result:
+            show_results(result)
+        results.append(result)
     return results
 
-def calc_best_play(session, week_start, week_close):
+def load_weekly_totals(session, season=None, player_id=None):
+    """
+    Sums every player's statistics per week in one query grouped on the integer game.week_id.
+    Args:
+    session: An SQL alchemy session object
+    season str:  A year in string format. If not set, loads all seasons
+    player_id int: If set, only loads this player's rows through the statistics.player_id index
+    Returns:
+    A pandas Dataframe with one row per week and player, ordered by week_id.
+    Columns are week_id, season, player_id, games, minutes, the sums of efficiency, points and rebounds,
+    and the week_start, week_end and season_week of the week from get_weeks.
+    """
+    stats = data.Statistics
+    efficiency = (stats.points + stats.def_rebound + stats.off_rebound + stats.assist +
+                  stats.steal + stats.block + stats.free_throws_made + stats.field_g_made +
+                  stats.field_g3_made - stats.free_throw_attempts - stats.field_g_attempts -
+                  stats.field_g3_attempts - stats.turnover)
+    #minutes are stored as 'MM:SS' or 'MM'
+    colon = func.instr(stats.minute, ':')
+    minutes = case((colon > 0, cast(func.substr(stats.minute, 1, colon - 1), Float) +
+                                cast(func.substr(stats.minute, colon + 1), Float) / 60),
+                   else_=cast(stats.minute, Float))
+
+    query = session.query(data.Game.week_id, func.max(data.Game.season).label('season'), stats.player_id,
+                          func.count(stats.points).label('games'),
+                          func.sum(minutes).label('minutes'),
+                          func.sum(efficiency).label('efficiency'),
+                          func.sum(stats.points).label('points'),
+                          func.sum(stats.off_rebound + stats.def_rebound).label('rebounds')) \
+                   .join(data.Game, data.Game.id==stats.game_id)
+    if season is not None:
+        query = query.filter(data.Game.season==season)
+    if player_id is not None:
+        query = query.filter(stats.player_id==player_id)
+    query = query.group_by(data.Game.week_id, stats.player_id).order_by(data.Game.week_id, stats.player_id)
+    totals = pd.read_sql(query.statement, session.bind)
+    weeks = get_weeks(session, season)[['week_id', 'week_start', 'week_end', 'season_week']]
+    return totals.merge(weeks, how='left', on='week_id')
+
+def calc_metrics(totals, min_minutes=36):
+    """
+    Turns summed statistics into the LEADERBOARD_METRICS.
+    Args:
+    totals pandas Dataframe: Sums with games, minutes, efficiency, points and rebounds columns
+    min_minutes float: Minutes needed for efficiency_per_minute, which is NaN below it. Default: 36
+    Returns:
+    A pandas Dataframe with one column per metric, aligned with totals.
+    """
+    games = totals['games'].where(totals['games'] > 0)
+    minutes = totals['minutes'].where(totals['minutes'] >= max(min_minutes, 1e-9))
+    return pd.DataFrame({'efficiency': totals['efficiency'] / games,
+                         'efficiency_per_minute': totals['efficiency'] / minutes,
+                         'points': totals['points'] / games,
+                         'rebounds': totals['rebounds'] / games})
+
+def select_top_k(groups, values, k):
     """
-    Queries the database for player efficiency in a given week.
+    Selects the k largest values of each group with a partial selection instead of a full sort.
     Args:
-    week_start str: A date string defining the start of the week.
-    week_close str: A date string defining the end of the week.
+    groups numpy array: Group keys, with equal keys next to each other
+    values numpy array: Values to rank. NaN values are never selected
+    k int: Number of values to select per group
     Returns:
-    best_play: An sql alchemy object containing the best play statistics
-    """
-    week_start = datetime.strptime(week_start, "%Y-%m-%d") - timedelta(days=1)
-    week_start =  datetime.strftime(week_start, "%Y-%m-%d")
-    week_close = datetime.strptime(week_close, "%Y-%m-%d") + timedelta(days=1) 
-    week_close = datetime.strftime(week_close, "%Y-%m-%d")
-
-    subq = session.query(data.Game, data.Statistics) \
-            .join(data.Statistics, data.Game.id==data.Statistics.game_id) \
-            .filter(between(data.Game.game_date_est, week_start, \
-                                                 week_close)) \
-            .subquery()
-
-    best_play = session.query(subq, func.round((subq.c.points + subq.c.def_rebound + subq.c.off_rebound + subq.c.assist +
-                                subq.c.steal + subq.c.block + subq.c.free_throws_made + subq.c.field_g_made +
-                                subq.c.field_g3_made - subq.c.free_throw_attempts - subq.c.field_g_attempts -
-                                subq.c.field_g3_attempts - subq.c.turnover) / func.count(subq.c.game_id),2).label('efficiency')) \
-                    .group_by(subq.c.player_id) \
-                    .order_by(desc('efficiency')) \
-                    .limit(1) \
-                    .first()
-    return best_play
+    A numpy array of positions, grouped in order and ranked from largest to smallest in each group.
+    Ties keep their original order.
+    """
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if len(groups) else np.array([], dtype=int)
+    ends = np.r_[starts[1:], len(groups)]
+    selected = []
+    for start, end in zip(starts, ends):
+        block = values[start:end]
+        candidates = np.flatnonzero(~np.isnan(block))
+        if len(candidates) > k:
+            candidates = np.sort(candidates[np.argpartition(-block[candidates], k - 1)[:k]])
+        candidates = candidates[np.argsort(-block[candidates], kind='stable')]
+        selected.append(candidates + start)
+    return np.concatenate(selected) if selected else np.array([], dtype=int)
+
+def calc_leaderboards(session, k=10, metrics=None, season=None, min_minutes=36):
+    """
+    Ranks the top k players of every week by each metric, from one grouped pass over the statistics.
+    Metrics:
+    efficiency: EFF per game played
+    efficiency_per_minute: EFF per minute played, for players with at least min_minutes in the week
+    points: Points per game played
+    rebounds: Rebounds per game played
+    Args:
+    session: An SQL alchemy session object
+    k int: Number of players per week and metric. Default: 10
+    metrics list: Names from LEADERBOARD_METRICS. Default: all of them
+    season str:  A year in string format. If not set, ranks all seasons
+    min_minutes float: Minutes a player needs in a week to be ranked per minute. Default: 36
+    Returns:
+    A pandas Dataframe with columns week_id, week_start, week_end, metric, rank, player_id, player_name and value,
+    ordered by week, metric and rank.
+    """
+    metrics = metrics or LEADERBOARD_METRICS
+    unknown = set(metrics) - set(LEADERBOARD_METRICS)
+    if unknown:
+        raise ValueError(f'Unknown metrics {sorted(unknown)}. Use any of {LEADERBOARD_METRICS}.')
+
+    totals = load_weekly_totals(session, season)
+    metric_values = calc_metrics(totals, min_minutes)
+
+    weeks = totals['week_id'].values
+    boards = []
+    for metric in metrics:
+        values = metric_values[metric].values.astype(float)
+        selected = select_top_k(weeks, values, k)
+        board = totals.iloc[selected][['week_id', 'week_start', 'week_end', 'player_id']].reset_index(drop=True)
+        board['metric'] = metric
+        board['rank'] = board.groupby('week_id').cumcount() + 1
+        board['value'] = values[selected]
+        boards.append(board)
+    leaderboards = pd.concat(boards, ignore_index=True)
+    leaderboards['metric_order'] = leaderboards['metric'].map(metrics.index)
+    leaderboards = leaderboards.sort_values(['week_id', 'metric_order', 'rank'], kind='mergesort')
+
+    names = dict(session.query(data.Player.id, data.Player.player_name))
+    leaderboards['player_name'] = [names.get(str(player_id), 'Name Unknown') for player_id in leaderboards['player_id']]
+    return leaderboards[['week_id', 'week_start', 'week_end', 'metric', 'rank', 'player_id', 'player_name', 'value']].reset_index(drop=True)
+
+def search_players(session, name, limit=10):
+    """
+    Looks up players by any part of their name through the player_search index.
+    Falls back to scanning the player table when the index is missing.
+    Args:
+    session: An SQL alchemy session object
+    name str: The name or part of a name to search for
+    limit int: Maximum number of players returned. Default: 10
+    Returns:
+    A list of (player_id, player_name) tuples, best matches first.
+    """
+    name = ' '.join(name.split())
+    if not name:
+        return []
+    connection = session.connection()
+    index_sql = connection.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'player_search'").scalar()
+    if index_sql is None or ('trigram' in index_sql and len(name) < 3):
+        #too short for trigrams, a scan of a few thousand names is still quick
+        pattern = name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query = '''SELECT id, player_name FROM player WHERE player_name LIKE ? ESCAPE '\\'
+                   ORDER BY player_name LIKE ? ESCAPE '\\' DESC, player_name LIMIT ?'''
+        rows = connection.exec_driver_sql(query, (f'%{pattern}%', f'{pattern}%', limit))
+    else:
+        if 'trigram' in index_sql:
+            match = '"{}"'.format(name.replace('"', '""'))
+        else:
+            match = ' '.join('"{}"*'.format(word.replace('"', '""')) for word in name.split())
+        query = '''SELECT player.id, player.player_name FROM player_search
+                   JOIN player ON player.rowid = player_search.rowid
+                   WHERE player_search MATCH ? ORDER BY rank LIMIT ?'''
+        rows = connection.exec_driver_sql(query, (match, limit))
+    return [(player_id, player_name) for (player_id, player_name) in rows]
+
+def player_profile(session, player_id, min_minutes=36):
+    """
+    Builds a player's career line from their own statistics rows only.
+    Args:
+    session: An SQL alchemy session object
+    player_id int: The player to profile
+    min_minutes float: Minutes needed for efficiency_per_minute, see calc_metrics. Default: 36
+    Returns:
+    A dictionary with the player_id, player_name and two pandas Dataframes:
+    seasons: games, minutes and LEADERBOARD_METRICS per season, with a final 'career' row
+    weeks: week_id, week_start, week_end, season, season_week, games, minutes and LEADERBOARD_METRICS per week
+    """
+    player = session.query(data.Player).filter(data.Player.id==player_id).first()
+    columns = ['games', 'minutes', 'efficiency', 'points', 'rebounds']
+    weeks = load_weekly_totals(session, player_id=player_id)
+    seasons = weeks.groupby('season')[columns].sum(min_count=1)
+    seasons.loc['career'] = weeks[columns].sum(min_count=1)
+
+    weeks_profile = weeks[['week_id', 'week_start', 'week_end', 'season', 'season_week', 'games', 'minutes']].copy()
+    weeks_profile = pd.concat([weeks_profile, calc_metrics(weeks, min_minutes)], axis=1)
+    seasons_profile = pd.concat([seasons[['games', 'minutes']], calc_metrics(seasons, min_minutes)], axis=1)
+    return {'player_id': player_id,
+            'player_name': player.player_name if player else 'Name Unknown',
+            'seasons': seasons_profile.reset_index(),
+            'weeks': weeks_profile}
 
 def show_results(iterable, spacing=15):
     """
@@ -3,8 +3,9 @@ import time
 import pandas as pd
 import data
 import models
-import joblib
-from player_efficiency import calc_player_efficiency, make_session
+from player_efficiency import calc_player_efficiency, calc_all_time_efficiency, make_session
+from player_efficiency import search_players, player_profile, show_results
+from export_results import write_results
 from sqlalchemy import create_engine
 
 def validate_input():
@@ -27,6 +28,7 @@ def play_player_productivity(session):
     print('Select a season and I will print out the best player each week.\n')
     time.sleep(0.5)
     program_end = False
+    results = None
     while not program_end:
         try:
             prompt = 'Enter a year from 2003 to 2019. Or enter 0 to see productivity every single week. (Or Enter x , X or exit to exit.) Your Input: '
@@ -41,7 +43,7 @@ def play_player_productivity(session):
                 results = calc_player_efficiency(session, int(input_one))
             elif int(input_one) == 0:
                 print('Most productive players each week FROM 2003 TO 2019!')
-                results  = calc_player_efficiency(session=session)
+                results  = calc_all_time_efficiency(session=session)
             else:
                 raise ValueError('Invalid Input')
             program_end = True
@@ -49,12 +51,43 @@ def play_player_productivity(session):
             print('Invalid Input. Pick a year between 2003 and 2019. Or Enter x, X or exit to exit.')
     if results:
         print(' ')
-        #prompt = 'Would you like to write the last results to a csv file before leaving? Enter y or Y for yes and any other key for No. Your Input: '
-        #print_input = input(prompt)
-        #if print_input in ['y','Y']:
-        #    df = pd.DataFrame(results[1:], columns=results[0])
-        #    df.to_csv('productivity_results',index=False)
-        #    print('File written to productivity_results.csv! \n')
+        prompt = 'Would you like to write the last results to a csv file before leaving? Enter y or Y for yes and any other key for No. Your Input: '
+        print_input = input(prompt)
+        if print_input in ['y','Y']:
+            write_results(results[1:], results[0], 'productivity_results.csv')
+            print('File written to productivity_results.csv! \n')
+
+def play_player_search(session):
+    """
+    Searches players by name and prints the career of the chosen player season by season
+    Args:
+    session obj: A session connection to the database
+    """
+    print('\nYou are in Home>Player Search\n')
+    time.sleep(0.5)
+    while True:
+        prompt = 'Enter a player name or part of it. (Or Enter x , X or exit to exit.) Your Input: '
+        name = input(prompt)
+        if name in ['x','X','exit']:
+            print(f'{name} entered. You are exiting Player search...')
+            break
+        matches = search_players(session, name)
+        if not matches:
+            print('No players found. Try again.')
+            continue
+        for (idx, (_, player_name)) in enumerate(matches):
+            print(f'{idx}: {player_name}')
+        choice = input('Enter the number of the player to see their career. Your Input: ')
+        if not choice.isdigit() or int(choice) >= len(matches):
+            print('Invalid Input. Pick one of the numbers listed.')
+            continue
+        profile = player_profile(session, matches[int(choice)][0])
+        print(f'\nCareer of {profile["player_name"]}')
+        seasons = profile['seasons'].round(2)
+        show_results(seasons.columns)
+        for season in seasons.values.tolist():
+            show_results(season)
+        print(' ')
 
 def play_game_prediction(session, model):
     """
@@ -153,7 +186,7 @@ def main():
         time.sleep(0.5)
         
         #make a db session connection
-        model = joblib.load(model_filepath)
+        model = models.load_model(model_filepath)
         #pdb.set_trace()
 
         print('Welcome to NBA Stats!!!\n')
@@ -162,7 +195,7 @@ def main():
         while user_input not in ['x','X','exit']:
             print('You are in the program home.\n')
             time.sleep(0.5)
-            prompt='Enter 1 to Analyse player productivity. Enter 2 for match prediction. (Enter x, X or exit.) Your Input: '
+            prompt='Enter 1 to Analyse player productivity. Enter 2 for match prediction. Enter 3 to search for a player. (Enter x, X or exit.) Your Input: '
             user_input = input(prompt)
 
             if user_input == '1':
@@ -181,6 +214,13 @@ def main():
                 time.sleep(0.5)
                 print('Game Prediction closed. Would you like to do more?')          
 
+            elif user_input == '3':
+                time.sleep(0.5)
+                session = make_session(database_filepath, read_only=True)
+                play_player_search(session)
+                session.close()
+                print('\nPlayer search closed...Would you like to do more?')
+
 
             elif user_input not in ['X','XX','exit']:
                 print('Invalid input...Try again.')